@@ -1,16 +1,33 @@
 import os
 import pandas as pd
 import time
+import re
+from urllib.parse import unquote
 from datetime import datetime
+from report_schema import read_report, drop_blob_columns, memory_usage_mb, DCM_MERGED_SCHEMA, BEESWAX_FILTERED_SCHEMA
 
-def process_reports():
+# Placement IDs are numeric and sit next to letters or punctuation in tracker URLs and tags
+# (e.g. "B2345.<id>;", "plc=<id>&" or, URL-encoded, "plc%3D<id>%26"), so any run of digits is a candidate
+ID_TOKEN_PATTERN = re.compile(r"\d+")
+
+def build_placement_index(beeswax_df, search_columns, placement_ids):
+    """Map each DCM placement ID to the positions of the Beeswax rows whose blobs contain it as a digit run."""
+    index = {}
+    blobs = zip(*(beeswax_df[col].fillna("").astype(str) for col in search_columns))
+    for position, values in enumerate(blobs):
+        for token in set(ID_TOKEN_PATTERN.findall(unquote(" ".join(values)))) & placement_ids:
+            index.setdefault(token, []).append(position)
+    return index
+
+DCM_FOLDER = r"C:\Catalina_auto_report\third_party_reports\dcm_folder"
+BEESWAX_FOLDER = r"C:\Catalina_auto_report\Beeswax_Data"
+
+def process_reports(dcm_folder=DCM_FOLDER, beeswax_folder=BEESWAX_FOLDER, output_folder=None):
     """Generates the Third_Party_Data report and saves it locally before uploading to Google Sheets."""
     start_time = time.time()  # Start Timer
     print("🔍 Starting process...")
 
-    dcm_folder = r"C:\Catalina_auto_report\third_party_reports\dcm_folder"
-    beeswax_folder = r"C:\Catalina_auto_report\Beeswax_Data"
-    output_folder = dcm_folder
+    output_folder = output_folder or dcm_folder
     output_file = f"Third_Party_Data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
 
     # Load DCM report
@@ -19,7 +36,8 @@ def process_reports():
         print(f"❌ Error: DCM report not found at {dcm_report_path}")
         return
     print("📥 Loading DCM report...")
-    dcm_df = pd.read_csv(dcm_report_path, dtype=str)
+    dcm_df = read_report(dcm_report_path, DCM_MERGED_SCHEMA)
+    print(f"✅ Loaded {len(dcm_df)} DCM rows ({memory_usage_mb(dcm_df):.1f} MB)")
 
     # Find the latest Beeswax report
     print("🔍 Searching for latest Beeswax report...")
@@ -36,7 +54,7 @@ def process_reports():
         print(f"❌ Error: Beeswax report not found at {beeswax_report_path}")
         return
     print("📥 Loading Beeswax report...")
-    beeswax_df = pd.read_csv(beeswax_report_path, dtype=str)
+    beeswax_df = read_report(beeswax_report_path, BEESWAX_FILTERED_SCHEMA)
 
     # Define the correct columns
     search_columns = ["creative_pixels", "creative_scripts", "creative_creative_content_munge"]
@@ -48,12 +66,16 @@ def process_reports():
 
     print(f"✅ Using columns for search: {available_columns}")
 
-    # Combine only the available columns
-    beeswax_df["combined_check"] = beeswax_df[available_columns].fillna("").agg(" ".join, axis=1)
+    # Index only the placement IDs present in the DCM report, then drop the blobs entirely
+    placement_ids = set(dcm_df["Placement ID"].dropna().astype(str).str.strip())
+    placement_index = build_placement_index(beeswax_df, available_columns, placement_ids)
+    beeswax_df = drop_blob_columns(beeswax_df)
+    print(f"✅ Indexed {len(placement_index)} of {len(placement_ids)} placement IDs; "
+          f"{len(beeswax_df)} Beeswax rows kept ({memory_usage_mb(beeswax_df):.1f} MB)")
 
     # Search function
     def find_match(placement_id):
-        return beeswax_df[beeswax_df["combined_check"].str.contains(placement_id, na=False)]
+        return beeswax_df.iloc[placement_index.get(str(placement_id).strip(), [])]
 
     print("🚀 Processing DCM placements... (this might take some time)")
     results = []
@@ -104,6 +126,7 @@ def process_reports():
     output_df.to_csv(output_path, index=False)
 
     print(f"🎉 Report generated successfully: {output_path}")
+    return output_path
 
 if __name__ == "__main__":
     process_reports()
\ No newline at end of file
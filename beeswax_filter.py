@@ -6,11 +6,37 @@ import os
 import logging
 from dotenv import load_dotenv
 import copy
+import io
+from urllib.parse import urlsplit, urlunsplit
+from raw_archive import RawArchive
+from beeswax_throttle import AdaptiveConcurrencyController
 
 load_dotenv("./input_folder/beeswax_input_filter.env")
 
+# When set (e.g. per account in multi_account_run.py), every API URL is pointed at this buyer host
+API_ROOT = os.getenv('BEESWAX_API_ROOT', '').rstrip('/')
+
 session = requests.Session()
 
+# Same adaptive limiter as beeswax_report.py, so entity pulls back off on 429/5xx and Retry-After
+controller = AdaptiveConcurrencyController(
+    initial_limit=int(os.getenv("BEESWAX_INITIAL_CONCURRENCY", "5")),
+    min_limit=int(os.getenv("BEESWAX_MIN_CONCURRENCY", "1")),
+    max_limit=int(os.getenv("BEESWAX_MAX_CONCURRENCY", "15")),
+    target_latency=float(os.getenv("BEESWAX_TARGET_LATENCY", "10"))
+)
+
+def get_api_url(env_var_name):
+    """Read an API URL from the environment, moved onto BEESWAX_API_ROOT's host when that is set."""
+    url = os.getenv(env_var_name)
+    if not API_ROOT:
+        return url
+    if not url:
+        return f"{API_ROOT}/authenticate" if env_var_name == 'LOGIN_URL' else None
+    root = urlsplit(API_ROOT)
+    parts = urlsplit(url)
+    return urlunsplit((root.scheme, root.netloc, parts.path, parts.query, parts.fragment))
+
 def get_login_credentials():
     return {
         "email": os.getenv('LOGIN_EMAIL'),
@@ -21,12 +47,12 @@ def get_login_credentials():
 def get_cookies():
     print("✅ Getting authentication cookies...")
     data = get_login_credentials()
-    url = os.getenv('LOGIN_URL')
-    response = session.post(url, data=data)
+    url = get_api_url('LOGIN_URL')
+    response = controller.request(session, "POST", url, data=data)
     print("✅ Authentication successful!")
     return session.cookies.get_dict()
 
-def get_payload_response(api_url, cookies, output_file):
+def get_payload_response(api_url, cookies, output_file, archive=None):
     print(f"✅ Fetching data from API: {api_url}")
     payload_list = []
     
@@ -35,10 +61,10 @@ def get_payload_response(api_url, cookies, output_file):
         
         for i in range(0, 20):  # Implementing pagination
             offset_url = api_url + f"&offset={i * 10000}"
-            response_data = requests.get(offset_url, cookies=cookies)
+            response_data = controller.request(session, "GET", offset_url, cookies=cookies)
             
             if response_data.status_code != 200:
-                response_data = requests.get(offset_url, cookies=get_cookies())
+                response_data = controller.request(session, "GET", offset_url, cookies=get_cookies())
             
             if response_data.status_code != 200:
                 logging.error("Wrong URL: %s", offset_url)
@@ -55,9 +81,21 @@ def get_payload_response(api_url, cookies, output_file):
             else:
                 print("No more data to fetch.")
                 break  # Stop if no more data
+
+    if archive and payload_list:
+        archive.store_file(output_file, "beeswax_filter", api_url=api_url, records=len(payload_list))
     
     return payload_list
 
+def load_archived_payload(archive, run_id, file_name):
+    """Read an entity dump back from an archived run instead of calling the API."""
+    entry = next((e for e in reversed(archive.run_entries(run_id)) if e["name"] == file_name), None)
+    if entry is None:
+        print(f"⚠️ {file_name} not found in archived run {run_id}")
+        return []
+    with archive.open(entry["digest"]) as stream:
+        return list(csv.DictReader(io.TextIOWrapper(stream, encoding='utf-8', newline='')))
+
 def get_custom_column_names():
     return {
         "campaign_columns": ["campaign_id", "campaign_name"],
@@ -94,27 +132,40 @@ def generate_consolidated_report():
     
     custom_column_names = get_custom_column_names()
     consolidated_reports_list = []
-    cookies = get_cookies()
+    archive = RawArchive(run_id=f"beeswax_filter_{datetime.now().strftime('%Y%m%d%H%M%S')}")
+    replay_run_id = os.getenv('FILTER_REPLAY_RUN_ID')
 
-    report_path = os.getenv('REPORT_PATH', './Beeswax_Data/raw/')
-    print(f"🛠️ REPORT_PATH from .env: {report_path}")
-    os.makedirs(report_path, exist_ok=True)  # ✅ Ensure folder exists
-    
-    print("Fetching campaigns...")
-    campaign_list = get_payload_response(os.getenv('CAMPAIGN_URL'), cookies, os.path.join(report_path, "campaigns.csv"))
-    print(f"Total campaigns fetched: {len(campaign_list)}")
-    
-    print("✅ Fetching line items...")
-    lineitem_list = get_payload_response(os.getenv('LINEITEM_URL'), cookies, os.path.join(report_path, "line_items.csv"))
-    print(f"Total line items fetched: {len(lineitem_list)}")
-    
-    print("✅ Fetching filtered creative-line item mappings...")
-    creative_lineitem_list = get_payload_response(os.getenv('CREATIVE_LINEITEM_URL'), cookies, os.path.join(report_path, "creative_line_items.csv"))
-    print(f"Total filtered creative-line item mappings fetched: {len(creative_lineitem_list)}")
-    
-    print("✅ Fetching filtered creatives...")
-    creative_list = get_payload_response(os.getenv('CREATIVE_URL'), cookies, os.path.join(report_path, "creatives.csv"))
-    print(f"Total filtered creatives fetched: {len(creative_list)}")
+    if replay_run_id:
+        print(f"🔁 Replaying entity dumps from archived run {replay_run_id}...")
+        campaign_list = load_archived_payload(archive, replay_run_id, "campaigns.csv")
+        lineitem_list = load_archived_payload(archive, replay_run_id, "line_items.csv")
+        creative_lineitem_list = load_archived_payload(archive, replay_run_id, "creative_line_items.csv")
+        creative_list = load_archived_payload(archive, replay_run_id, "creatives.csv")
+    else:
+        cookies = get_cookies()
+
+        report_path = os.getenv('REPORT_PATH', './Beeswax_Data/raw/')
+        print(f"🛠️ REPORT_PATH from .env: {report_path}")
+        os.makedirs(report_path, exist_ok=True)  # ✅ Ensure folder exists
+
+        print("Fetching campaigns...")
+        campaign_list = get_payload_response(get_api_url('CAMPAIGN_URL'), cookies, os.path.join(report_path, "campaigns.csv"), archive)
+        print(f"Total campaigns fetched: {len(campaign_list)}")
+
+        print("✅ Fetching line items...")
+        lineitem_list = get_payload_response(get_api_url('LINEITEM_URL'), cookies, os.path.join(report_path, "line_items.csv"), archive)
+        print(f"Total line items fetched: {len(lineitem_list)}")
+
+        print("✅ Fetching filtered creative-line item mappings...")
+        creative_lineitem_list = get_payload_response(get_api_url('CREATIVE_LINEITEM_URL'), cookies, os.path.join(report_path, "creative_line_items.csv"), archive)
+        print(f"Total filtered creative-line item mappings fetched: {len(creative_lineitem_list)}")
+
+        print("✅ Fetching filtered creatives...")
+        creative_list = get_payload_response(get_api_url('CREATIVE_URL'), cookies, os.path.join(report_path, "creatives.csv"), archive)
+        print(f"Total filtered creatives fetched: {len(creative_list)}")
+        print(archive.summary())
+        metrics = controller.metrics()
+        print(f"📊 Request metrics: limit {metrics['current_limit']}, {metrics['throttled']} throttled, {metrics['server_errors']} server errors")
     
     print("🔄 Processing data...")
     for _campaign in campaign_list:
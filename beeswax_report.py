@@ -1,13 +1,18 @@
 import requests
-import pandas as pd
 import time
 from datetime import datetime, timedelta
 import os
 from dotenv import load_dotenv
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import calendar
+import io
 import pytz
 import re
+import json
+from beeswax_throttle import AdaptiveConcurrencyController
+from report_schema import read_report, concat_reports, REPORT_SCHEMAS
+from raw_archive import RawArchive
+from spend_rollup import update_spend_rollups
 
 # Load environment variables
 load_dotenv("./input_folder/beeswax_input_report.env")
@@ -15,7 +20,9 @@ load_dotenv("./input_folder/beeswax_input_report.env")
 # Beeswax API Credentials
 USERNAME = os.getenv('LOGIN_EMAIL')
 PASSWORD = os.getenv('PASSWORD')
-BASE_URL = "https://catalina.api.beeswax.com/rest/v2/authenticate"
+# Buyer host of the account to report on; override per account for multi-account runs
+API_ROOT = os.getenv("BEESWAX_API_ROOT", "https://catalina.api.beeswax.com/rest/v2").rstrip("/")
+BASE_URL = f"{API_ROOT}/authenticate"
 
 # Get current time in UTC
 utc_now = datetime.now(pytz.UTC)
@@ -31,6 +38,21 @@ START_DATE_REACH_C = os.getenv("START_DATE_REACH_C", "2024-01-01")
 # Always set END_DATE to today
 END_DATE = today
 
+# Parse each chunk as soon as it downloads instead of rescanning the raw folder afterwards
+PIPELINED_MERGE = os.getenv("BEESWAX_PIPELINED_MERGE", "true").strip().lower() in ("1", "true", "yes")
+
+# Fold each merged Spend report into the campaign x day / campaign x month rollups
+SPEND_ROLLUPS = os.getenv("BEESWAX_SPEND_ROLLUPS", "true").strip().lower() in ("1", "true", "yes")
+
+# Rebuild the merged reports from an archived run instead of calling the API
+REPLAY_RUN_ID = os.getenv("BEESWAX_REPLAY_RUN_ID")
+
+# Concurrency bounds shared by report submissions, status polls and downloads
+MIN_CONCURRENCY = int(os.getenv("BEESWAX_MIN_CONCURRENCY", "1"))
+INITIAL_CONCURRENCY = int(os.getenv("BEESWAX_INITIAL_CONCURRENCY", "5"))
+MAX_CONCURRENCY = int(os.getenv("BEESWAX_MAX_CONCURRENCY", "15"))
+TARGET_LATENCY = float(os.getenv("BEESWAX_TARGET_LATENCY", "10"))
+
 # Custom function to parse timezone lists from environment variables
 def parse_timezone_list(env_var_name, default_timezone="America/New_York"):
     """Parse a list of timezones from an environment variable."""
@@ -113,9 +135,8 @@ for report_name, config in report_configs.items():
 # Fix folder path to absolute
 data_folder = os.path.abspath(f"Beeswax_reports/{today.split()[0]}")
 
-# Create folder for backup
-backup_folder = os.path.abspath(f"Beeswax_reports/{today}")
-os.makedirs(backup_folder, exist_ok=True)
+# Every downloaded chunk is kept compressed in the raw archive, so the raw folder can be cleared each run
+archive = RawArchive(run_id=f"beeswax_report_{utc_now.strftime('%Y%m%d%H%M%S')}")
 
 # Create folders if they don't exist
 try:
@@ -124,18 +145,27 @@ try:
 except Exception as e:
     print(f"❌ Error creating directories: {e}")
 
-# Delete old files in the data folder before starting a new run
-for root, dirs, files in os.walk(data_folder):
-    for file in files:
-        file_path = os.path.join(root, file)
-        try:
-            os.remove(file_path)
-        except Exception as e:
-            print(f"❌ Error deleting file {file_path}: {e}")
+# Delete old files in the data folder before starting a new run (a replay leaves today's reports alone)
+if not REPLAY_RUN_ID:
+    for root, dirs, files in os.walk(data_folder):
+        for file in files:
+            file_path = os.path.join(root, file)
+            try:
+                os.remove(file_path)
+            except Exception as e:
+                print(f"❌ Error deleting file {file_path}: {e}")
 
 # Start session
 session = requests.Session()
 
+# One controller for every API call so submissions, polls and downloads share the same quota
+controller = AdaptiveConcurrencyController(
+    initial_limit=INITIAL_CONCURRENCY,
+    min_limit=MIN_CONCURRENCY,
+    max_limit=MAX_CONCURRENCY,
+    target_latency=TARGET_LATENCY
+)
+
 def get_login_credentials():
     return {
         "email": USERNAME,
@@ -220,26 +250,35 @@ def request_report(cookies, csrf_token, report_type, start_date, end_date, timez
 
     def send_report_request(start_period, end_period, retries=3):
         payload = get_payload(report_type, start_period, end_period, timezone)
-        report_endpoint = "https://catalina.api.beeswax.com/rest/v2/reporting/run-query"
+        report_endpoint = f"{API_ROOT}/reporting/run-query"
 
         # Include timezone in log message if specified
         tz_info = f" [TZ: {timezone}]" if timezone else ""
         
         for attempt in range(retries):
-            response = session.post(report_endpoint, json=payload, headers=headers, cookies=cookies)
+            try:
+                # Submissions aren't idempotent, so only 429s are retried; a 5xx may already have queued the query
+                response = controller.request(session, "POST", report_endpoint, idempotent=False,
+                                              json=payload, headers=headers, cookies=cookies)
+            except requests.exceptions.RequestException as e:
+                print(f"❌ Report request failed for {start_period} - {end_period}{tz_info}: {e}")
+                break
+
             if response.status_code == 200:
                 report_data = response.json()
                 task_id = report_data.get("task_id")
                 if task_id:
                     return (task_id, start_period, end_period, timezone)
+                print(f"⚠️ Attempt {attempt+1}/{retries} returned no task ID{tz_info}.")
             else:
-                print(f"⚠️ Attempt {attempt+1}/{retries} failed. Retrying in 5s...")
-                time.sleep(5)
+                # Throttling was already retried by the controller; server errors aren't retried to avoid duplicate queries
+                print(f"⚠️ Report request rejected ({response.status_code}) for {start_period} - {end_period}{tz_info}: {response.text}")
+                break
 
         print(f"❌ Final attempt failed for {start_period} - {end_period}{tz_info}")
         return None
 
-    with ThreadPoolExecutor(max_workers=5) as executor:
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENCY) as executor:
         future_tasks = []
 
         # Different handling based on whether we need to split by month
@@ -288,8 +327,8 @@ def request_report(cookies, csrf_token, report_type, start_date, end_date, timez
         return task_ids
 
 def fetch_report(cookies, tid, s_date, e_date, report_type, timezone=None):
-    """ Fetch and download a report from Beeswax API """
-    report_status_url = f"https://catalina.api.beeswax.com/rest/v2/reporting/async-results/{tid}"
+    """ Fetch and download a report from Beeswax API. Returns (file name, content) or (None, None). """
+    report_status_url = f"{API_ROOT}/reporting/async-results/{tid}"
     headers = {'User-Agent': 'python-requests/2.32.3', 'Accept': 'application/json'}
     download_folder = os.path.join(data_folder, "beeswax_raw")
 
@@ -299,20 +338,23 @@ def fetch_report(cookies, tid, s_date, e_date, report_type, timezone=None):
 
     for attempt in range(10):
         try:
-            response = session.get(report_status_url, headers=headers, cookies=cookies)
+            response = controller.request(session, "GET", report_status_url, headers=headers, cookies=cookies)
             response.raise_for_status()
 
             if response.status_code == 200 and response.content:
                 file_name = f"{report_type.lower()}_{s_date}_to_{e_date}{tz_suffix}_{tid}.csv"
-                file_path = os.path.join(download_folder, file_name)
 
                 if len(response.content) > 10:
-                    with open(file_path, "wb") as f:
-                        f.write(response.content)
-                    return file_path
+                    # The pipelined merge parses the chunk in memory, so the archive is the only copy on disk
+                    if not PIPELINED_MERGE:
+                        with open(os.path.join(download_folder, file_name), "wb") as f:
+                            f.write(response.content)
+                    archive.store(response.content, file_name, report_type, task_id=tid,
+                                  start_date=s_date, end_date=e_date, timezone=timezone)
+                    return file_name, response.content
                 else:
                     print(f"⚠️ Received an empty report for Task ID {tid} ({s_date} to {e_date}){tz_info}")
-                    return None
+                    return None, None
 
             print(f"⚠️ Unexpected response ({response.status_code}): {response.text}")
             time.sleep(10)
@@ -320,24 +362,130 @@ def fetch_report(cookies, tid, s_date, e_date, report_type, timezone=None):
             print(f"❌ Error checking report status for Task ID {tid}: {e}")
 
     print(f"❌ Failed to download report for Task ID: {tid} after multiple attempts.")
-    return None
+    return None, None
 
 def download_report(cookies, task_ids, report_type):
-    """ Download reports in parallel to speed up execution. """
+    """ Download reports in parallel to speed up execution. Returns the (start, end) ranges that downloaded. """
     if not task_ids:
         print(f"⚠️ No valid task IDs for {report_type}. Skipping download.")
-        return
+        return []
 
-    with ThreadPoolExecutor(max_workers=5) as executor:
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENCY) as executor:
         future_downloads = [
-            executor.submit(fetch_report, cookies, tid, s_date, e_date, report_type, timezone)
+            (executor.submit(fetch_report, cookies, tid, s_date, e_date, report_type, timezone), s_date, e_date)
             for tid, s_date, e_date, timezone in task_ids
         ]
 
-        for future in future_downloads:
-            result = future.result()
-            if not result:
+        received_ranges = []
+        for future, s_date, e_date in future_downloads:
+            file_name, _ = future.result()
+            if not file_name:
+                print(f"⚠️ A report failed to download.")
+                continue
+            received_ranges.append((s_date, e_date))
+
+    return sorted(received_ranges)
+
+def parse_report_chunk(buffer, report_type, source):
+    """ Parse a report chunk from an in-memory or archived stream and check it has the requested fields. """
+    try:
+        df = read_report(buffer, REPORT_SCHEMAS[report_type])
+    except Exception as e:
+        print(f"❌ Error parsing {source}: {e}")
+        return None
+
+    expected_fields = get_payload(report_type, None, None)["fields"]
+    missing_fields = [field for field in expected_fields if field not in df.columns]
+    if missing_fields:
+        print(f"❌ {source} is missing expected columns {missing_fields}. Skipping.")
+        return None
+
+    return df
+
+def download_and_merge_report(cookies, task_ids, report_name, timezone=None):
+    """
+    Download reports in parallel and merge each chunk as soon as it arrives.
+    Returns the merged report path and the (start, end) ranges of the chunks that downloaded and parsed.
+    """
+    if not task_ids:
+        print(f"⚠️ No valid task IDs for {report_name}. Skipping download.")
+        return None, []
+
+    tz_info = f" ({timezone})" if timezone else ""
+
+    chunks = []
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENCY) as executor:
+        future_downloads = {
+            executor.submit(fetch_report, cookies, tid, s_date, e_date, report_name, tz): (tid, s_date, e_date)
+            for tid, s_date, e_date, tz in task_ids
+        }
+
+        for future in as_completed(future_downloads):
+            tid, s_date, e_date = future_downloads[future]
+            file_name, content = future.result()
+            if not file_name:
                 print(f"⚠️ A report failed to download.")
+                continue
+
+            df = parse_report_chunk(io.BytesIO(content), report_name, file_name)
+            if df is not None:
+                chunks.append((s_date, e_date, df))
+                print(f"📥 Parsed chunk {s_date} to {e_date}{tz_info}: {len(df)} rows ({len(chunks)}/{len(task_ids)})")
+
+    # Chunks finish in any order; merge them by date range so the output is the same on every run
+    chunks.sort(key=lambda chunk: (chunk[0], chunk[1]))
+    received_ranges = [(s_date, e_date) for s_date, e_date, _ in chunks]
+    return write_merged_report([df for _, _, df in chunks], report_name, timezone), received_ranges
+
+def write_merged_report(df_list, report_name, timezone=None, output_folder=None, date_tag=None):
+    """ Concatenate parsed chunks and save them as the merged report. """
+    tz_suffix = f"_tz_{timezone.replace('/', '_')}" if timezone else ""
+    tz_info = f" ({timezone})" if timezone else ""
+    merged_file_name = f"{report_name}{tz_suffix}_{date_tag or today.replace('-', '')}.csv"
+    merged_file_path = os.path.join(output_folder or data_folder, merged_file_name)
+
+    if not df_list:
+        print(f"❌ No valid data found in reports for {report_name}{tz_info}.")
+        return None
+
+    merged_df = concat_reports(df_list, REPORT_SCHEMAS[report_name])
+    merged_df.to_csv(merged_file_path, index=False)
+    print(f"✅ Merged report saved as {merged_file_path}")
+
+    return merged_file_path
+
+def replay_archived_run(run_id):
+    """ Rebuild the merged reports of a past run from the raw archive without calling the API. """
+    entries = [e for e in archive.run_entries(run_id) if e["source"] in REPORT_SCHEMAS]
+    if not entries:
+        print(f"❌ No archived report chunks found for run {run_id}. Available runs: {archive.list_runs()}")
+        return []
+
+    # Replays go to their own folder and carry the replayed run's date, never today's live reports
+    replay_folder = os.path.abspath(f"Beeswax_reports/replay/{run_id}")
+    os.makedirs(replay_folder, exist_ok=True)
+    run_timestamp = re.search(r"(\d{8})\d{6}$", run_id)
+    date_tag = run_timestamp.group(1) if run_timestamp else run_id
+    entries.sort(key=lambda e: (e.get("start_date") or "", e.get("end_date") or ""))
+
+    merged_paths = []
+    for report_name, timezone in sorted({(e["source"], e.get("timezone") or "") for e in entries}):
+        timezone = timezone or None
+        df_list = []
+        for entry in entries:
+            if entry["source"] != report_name or (entry.get("timezone") or None) != timezone:
+                continue
+            with archive.open(entry["digest"]) as stream:
+                df = parse_report_chunk(stream, report_name, entry["name"])
+            if df is not None:
+                df_list.append(df)
+
+        print(f"🔁 Replaying {len(df_list)} archived chunks for {report_name} [TZ: {timezone}]")
+        merged_report_path = write_merged_report(df_list, report_name, timezone, replay_folder, date_tag)
+        if merged_report_path:
+            merged_paths.append(merged_report_path)
+
+    return merged_paths
 
 def merge_reports(report_name, timezone=None):
     """ Merge all downloaded reports into one file with a dynamic name. """
@@ -376,7 +524,7 @@ def merge_reports(report_name, timezone=None):
             time.sleep(2)
 
         try:
-            df = pd.read_csv(file_path)
+            df = read_report(file_path, REPORT_SCHEMAS[report_name])
             df_list.append(df)
         except Exception as e:
             print(f"❌ Error reading {file}: {e}")
@@ -385,17 +533,34 @@ def merge_reports(report_name, timezone=None):
         print(f"❌ No valid data found in reports for {report_name}{tz_info}.")
         return None
 
-    merged_df = pd.concat(df_list, ignore_index=True)
+    merged_df = concat_reports(df_list, REPORT_SCHEMAS[report_name])
     merged_df.to_csv(merged_file_path, index=False)
     print(f"✅ Merged report saved as {merged_file_path}")
 
     return merged_file_path
 
+def save_request_metrics():
+    """ Print the concurrency controller's metrics and save them next to the reports. """
+    metrics = controller.metrics()
+    print(f"📊 Request metrics: limit {metrics['current_limit']} (range {metrics['min_limit_seen']}-{metrics['max_limit_seen']}), "
+          f"peak in-flight {metrics['peak_in_flight']}, {metrics['throttled']} throttled, {metrics['server_errors']} server errors")
+
+    metrics_path = os.path.join(data_folder, "beeswax_request_metrics.json")
+    with open(metrics_path, "w") as f:
+        json.dump(metrics, f, indent=2)
+    return metrics_path
+
 def main():
     start_time = time.time()
     print("🚀 Starting Beeswax API Automation...")
     
-    cookies, csrf_token = authenticate_beeswax()
+    if REPLAY_RUN_ID:
+        print(f"🔁 Replaying archived run {REPLAY_RUN_ID}...")
+        replay_archived_run(REPLAY_RUN_ID)
+        cookies, csrf_token = None, None
+    else:
+        cookies, csrf_token = authenticate_beeswax()
+
     if cookies and csrf_token:
         print("🔄 Proceeding to request reports...")
 
@@ -414,14 +579,26 @@ def main():
                 task_ids = request_report(cookies, csrf_token, report_name, start_date, end_date, timezone, split_by_month)
 
                 if task_ids:
-                    download_report(cookies, task_ids, report_name)
-                    merged_report_path = merge_reports(report_name, timezone)
+                    if PIPELINED_MERGE:
+                        merged_report_path, received_ranges = download_and_merge_report(cookies, task_ids, report_name, timezone)
+                    else:
+                        received_ranges = download_report(cookies, task_ids, report_name)
+                        merged_report_path = merge_reports(report_name, timezone)
 
                     if merged_report_path:
                         print(f"✅ Merged report created for {report_name} [TZ: {timezone}]")
+                        if SPEND_ROLLUPS and report_name == "Beeswax_Spend":
+                            # Only the ranges that actually arrived may replace stored days
+                            try:
+                                update_spend_rollups(merged_report_path, timezone, received_ranges)
+                            except Exception as e:
+                                print(f"❌ Error updating Spend rollups for {timezone}: {e}")
                     else:
                         print(f"⚠️ Merging failed for {report_name} [TZ: {timezone}]")
 
+        save_request_metrics()
+        print(archive.summary())
+
     end_time = time.time()
     total_time = end_time - start_time
     minutes, seconds = divmod(total_time, 60)
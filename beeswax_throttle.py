@@ -0,0 +1,183 @@
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import requests
+
+# Status codes that mean "slow down" rather than "this request is wrong"
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+def parse_retry_after(value):
+    """Return the Retry-After header value in seconds, or None if it can't be read."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+class AdaptiveConcurrencyController:
+    """
+    Shared AIMD limiter for Beeswax API calls.
+
+    Every submission, poll and download takes a slot before hitting the API. Fast 2xx responses
+    grow the limit by roughly one slot per round of requests; 429/5xx responses, slow responses
+    and connection errors halve it, and a Retry-After header pauses all new requests until it
+    expires. Other 4xx responses are counted but leave the limit alone.
+    """
+
+    def __init__(self, initial_limit=5, min_limit=1, max_limit=20, target_latency=10.0,
+                 decrease_factor=0.5, max_backoff=60.0):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.target_latency = target_latency
+        self.decrease_factor = decrease_factor
+        self.max_backoff = max_backoff
+
+        self._limit = float(max(min_limit, min(initial_limit, max_limit)))
+        self._in_flight = 0
+        self._paused_until = 0.0
+        self._last_decrease = float("-inf")
+        self._condition = threading.Condition()
+
+        self._stats = {
+            "requests": 0,
+            "successes": 0,
+            "throttled": 0,
+            "server_errors": 0,
+            "connection_errors": 0,
+            "client_errors": 0,
+            "slow_responses": 0,
+            "peak_in_flight": 0,
+            "min_limit_seen": int(self._limit),
+            "max_limit_seen": int(self._limit),
+            "total_latency": 0.0,
+        }
+
+    @property
+    def limit(self):
+        return max(self.min_limit, int(self._limit))
+
+    def acquire(self):
+        """Block until a slot is free and no Retry-After pause is active."""
+        with self._condition:
+            while True:
+                wait_for = self._paused_until - time.monotonic()
+                if wait_for > 0:
+                    self._condition.wait(wait_for)
+                elif self._in_flight >= self.limit:
+                    self._condition.wait()
+                else:
+                    break
+            self._in_flight += 1
+            self._stats["requests"] += 1
+            self._stats["peak_in_flight"] = max(self._stats["peak_in_flight"], self._in_flight)
+
+    def release(self):
+        with self._condition:
+            self._in_flight -= 1
+            self._condition.notify_all()
+
+    def record_success(self, latency):
+        with self._condition:
+            self._stats["successes"] += 1
+            self._stats["total_latency"] += latency
+            if latency > self.target_latency:
+                self._stats["slow_responses"] += 1
+                self._decrease()
+            else:
+                # Additive increase: about one extra slot once a full window of requests succeeds
+                self._limit = min(self.max_limit, self._limit + 1.0 / self._limit)
+                self._track_limit()
+            self._condition.notify_all()
+
+    def record_client_error(self):
+        # A 4xx says nothing about API capacity, so it neither grows nor shrinks the limit
+        with self._condition:
+            self._stats["client_errors"] += 1
+
+    def record_failure(self, status_code=None, retry_after=None):
+        with self._condition:
+            if status_code == 429:
+                self._stats["throttled"] += 1
+            elif status_code is not None:
+                self._stats["server_errors"] += 1
+            else:
+                self._stats["connection_errors"] += 1
+            self._decrease()
+            if retry_after:
+                self._paused_until = max(self._paused_until, time.monotonic() + min(retry_after, self.max_backoff))
+            self._condition.notify_all()
+
+    def _decrease(self):
+        # Requests that were already in flight report the same congestion; only back off once per window
+        now = time.monotonic()
+        if now - self._last_decrease < self.target_latency:
+            return
+        self._last_decrease = now
+        self._limit = max(self.min_limit, self._limit * self.decrease_factor)
+        self._track_limit()
+
+    def _track_limit(self):
+        self._stats["min_limit_seen"] = min(self._stats["min_limit_seen"], self.limit)
+        self._stats["max_limit_seen"] = max(self._stats["max_limit_seen"], self.limit)
+
+    def request(self, session, method, url, max_retries=5, idempotent=True, **kwargs):
+        """
+        Send a request through the limiter, retrying 429/5xx responses and connection errors.
+
+        For non-idempotent requests (e.g. report submissions) only 429s are retried, since a 5xx
+        or dropped connection may already have been processed and a retry could duplicate it.
+        Returns the last response, which may still carry a retryable status once retries run out.
+        """
+        for attempt in range(max_retries):
+            self.acquire()
+            start = time.monotonic()
+            try:
+                response = session.request(method, url, **kwargs)
+            except requests.exceptions.RequestException as e:
+                self.release()
+                self.record_failure()
+                if attempt == max_retries - 1 or not idempotent:
+                    raise
+                backoff = min(self.max_backoff, 2 ** attempt)
+                print(f"⚠️ Request error for {url}: {e}. Retrying in {backoff}s...")
+                time.sleep(backoff)
+                continue
+            latency = time.monotonic() - start
+            self.release()
+
+            if 200 <= response.status_code < 300:
+                self.record_success(latency)
+                return response
+            if response.status_code not in RETRYABLE_STATUS_CODES:
+                if 400 <= response.status_code < 500:
+                    self.record_client_error()
+                return response
+
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            self.record_failure(response.status_code, retry_after)
+            if attempt == max_retries - 1 or (not idempotent and response.status_code != 429):
+                break
+            backoff = min(self.max_backoff, retry_after if retry_after is not None else 2 ** attempt)
+            print(f"⚠️ {response.status_code} from {url} (limit now {self.limit}). Retrying in {backoff:.0f}s...")
+            time.sleep(backoff)
+
+        return response
+
+    def metrics(self):
+        """Snapshot of the current limits and request counters."""
+        with self._condition:
+            stats = dict(self._stats)
+            total_latency = stats.pop("total_latency")
+            stats["avg_latency_seconds"] = round(total_latency / stats["successes"], 3) if stats["successes"] else None
+            stats["current_limit"] = self.limit
+            stats["in_flight"] = self._in_flight
+            stats["paused_for_seconds"] = round(max(0.0, self._paused_until - time.monotonic()), 1)
+            return stats
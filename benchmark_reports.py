@@ -0,0 +1,243 @@
+import argparse
+import csv
+import importlib
+import os
+import random
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from dcm_report import merged_dcm_report
+
+# 3p_report.py can't be imported with a normal import statement because of the leading digit
+third_party_report = importlib.import_module("3p_report")
+
+RESULTS_FILE = os.path.abspath("./Benchmark_results/benchmark_history.csv")
+RESULT_FIELDS = [
+    "run_at", "version", "label", "stage", "seed", "dcm_files", "dcm_rows_per_file",
+    "placements", "beeswax_rows", "input_rows", "output_rows", "seconds", "rows_per_sec", "peak_memory_mb"
+]
+
+# merged_dcm_report reads the 6 lines after "Report Fields" as the header block and data from the 7th on
+DCM_HEADER_BLOCK_LINES = 6
+
+# Header spellings seen in client DCM exports; find_required_columns matches them case-insensitively
+DCM_HEADER_VARIANTS = [
+    ["Date", "Placement ID", "Impressions", "Clicks", "Video Completions"],
+    ["Placement ID", "Date", "Impressions", "Clicks"],
+    ["DATE", "PLACEMENT ID", "IMPRESSIONS", "VIDEO COMPLETIONS", "CLICKS"],
+    ["Advertiser", "Campaign", "Date", "Placement", "Placement ID", "Impressions", "Clicks", "Video Completions"],
+]
+
+CREATIVE_PREFIXES = [("MO", "_BA_"), ("MO", "_RM_"), ("DE_", "_BA_"), ("DE_", "_VI_"), ("CTV_", "_VI_")]
+
+def generate_placement_ids(count, rng):
+    return [str(rng.randint(200000000, 399999999)) for _ in range(count)]
+
+def write_dcm_email_report(file_path, placement_ids, rows, start_date, rng):
+    """Write one DCM email export with the preamble, header block and Grand Total row."""
+    header = rng.choice(DCM_HEADER_VARIANTS)
+    header_offset = rng.randrange(DCM_HEADER_BLOCK_LINES)
+    totals = {"Impressions": 0, "Clicks": 0, "Video Completions": 0}
+
+    with open(file_path, "w", newline="", encoding="utf-8-sig") as file:
+        writer = csv.writer(file)
+        writer.writerow(["Campaign Manager 360 Report"])
+        writer.writerow(["Report Name", f"Catalina_Daily_{rng.randint(1000, 9999)}"])
+        writer.writerow(["Date/Time Generated", datetime.now().strftime("%b %d, %Y %I:%M:%S %p")])
+        writer.writerow(["Date Range", f"{start_date:%Y-%m-%d} - {start_date + timedelta(days=rows // max(1, len(placement_ids))):%Y-%m-%d}"])
+        writer.writerow([])
+        writer.writerow(["Report Fields"])
+        # The column header can sit anywhere in the block; the remaining lines are blank
+        for i in range(DCM_HEADER_BLOCK_LINES):
+            writer.writerow(header if i == header_offset else [])
+
+        for i in range(rows):
+            day = start_date + timedelta(days=i // max(1, len(placement_ids)))
+            impressions = rng.randint(0, 50000)
+            values = {
+                "Date": day.strftime("%Y-%m-%d"),
+                "Placement ID": placement_ids[i % len(placement_ids)],
+                "Impressions": impressions,
+                "Clicks": rng.randint(0, impressions // 100 + 1),
+                "Video Completions": rng.randint(0, impressions // 2 + 1),
+                "Advertiser": "Catalina",
+                "Campaign": f"Campaign {rng.randint(1, 50)}",
+                "Placement": f"Placement, Site {rng.randint(1, 500)}",
+            }
+            for key in totals:
+                totals[key] += values[key]
+            writer.writerow([values[col.title().replace(" Id", " ID")] for col in header])
+
+        writer.writerow(["Grand Total:"] + [totals.get(col.title(), "") for col in header[1:]])
+
+def generate_dcm_reports(folder_path, files, rows_per_file, placement_ids, seed=0):
+    """Write `files` DCM email exports into folder_path and return the number of data rows written."""
+    rng = random.Random(seed)
+    os.makedirs(folder_path, exist_ok=True)
+    start_date = datetime(2024, 1, 1)
+    for i in range(files):
+        file_path = os.path.join(folder_path, f"dcm_email_report_{i:04d}.csv")
+        write_dcm_email_report(file_path, placement_ids, rows_per_file, start_date + timedelta(days=i), rng)
+    return files * rows_per_file
+
+def make_creative_blobs(placement_id, rng):
+    """Return (pixels, scripts, content_munge) that embed placement_id the way DCM trackers do."""
+    site_id = rng.randint(1000000, 9999999)
+    ad_id = rng.randint(100000000, 999999999)
+    pixels = (
+        f"https://ad.doubleclick.net/ddm/trackimp/N{site_id}.{rng.randint(100, 999)}CATALINA/"
+        f"B{rng.randint(20000000, 29999999)}.{placement_id};dc_trk_aid={ad_id};dc_trk_cid={rng.randint(100000000, 999999999)};"
+        f"ord=[timestamp];dc_lat=;dc_rdid=;tag_for_child_directed_treatment=;tfua=?"
+    )
+    scripts = (
+        f"<script src=\"https://cdn.doubleverify.com/dvtp_src.js?ctx={site_id}&cmp=DV{rng.randint(100000, 999999)}"
+        f"&sid={placement_id}&plc={placement_id}&adsrv=1&btreg=&btadsrv=&crt=&tagtype=&dvtagver=6.1.src\"></script>"
+    )
+    munge = f"{pixels} {'x' * rng.randint(200, 2000)}"
+    return pixels, scripts, munge
+
+def generate_beeswax_filtered_report(file_path, rows, placement_ids, match_rate=0.8, seed=0):
+    """Write a beeswax_filtered_report CSV where roughly match_rate of the rows embed a known placement ID."""
+    rng = random.Random(seed)
+    fieldnames = [
+        "campaign_campaign_id", "campaign_campaign_name", "line_item_line_item_id", "line_item_line_item_name",
+        "creative_creative_id", "creative_creative_name", "creative_pixels", "creative_scripts",
+        "creative_creative_content_munge"
+    ]
+    campaigns = max(1, rows // 200)
+    line_items = max(1, rows // 20)
+
+    with open(file_path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.DictWriter(file, fieldnames=fieldnames)
+        writer.writeheader()
+        for i in range(rows):
+            campaign_id = 1000 + i % campaigns
+            line_item_id = 50000 + i % line_items
+            prefix, creative_format = rng.choice(CREATIVE_PREFIXES)
+            placement_id = rng.choice(placement_ids) if rng.random() < match_rate else str(rng.randint(900000000, 999999999))
+            pixels, scripts, munge = make_creative_blobs(placement_id, rng)
+            writer.writerow({
+                "campaign_campaign_id": campaign_id,
+                "campaign_campaign_name": f"Catalina_Campaign_{campaign_id}",
+                "line_item_line_item_id": line_item_id,
+                "line_item_line_item_name": f"Catalina_Campaign_{campaign_id}_LI_{line_item_id}",
+                "creative_creative_id": 700000 + i,
+                "creative_creative_name": f"{prefix}Catalina{creative_format}{rng.randint(300, 728)}x{rng.randint(50, 250)}_{i}",
+                "creative_pixels": pixels,
+                "creative_scripts": scripts,
+                "creative_creative_content_munge": munge,
+            })
+    return rows
+
+def get_version():
+    try:
+        return subprocess.check_output(["git", "describe", "--always", "--dirty"], text=True, stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def measure(stage, func, *args):
+    """
+    Run func(*args) twice and return (result, seconds, peak memory in MB).
+
+    tracemalloc slows pandas-heavy code down by an order of magnitude, so the timing comes from an
+    untraced run and the peak memory from a second, traced run. func must be safe to repeat.
+    """
+    start = time.perf_counter()
+    result = func(*args)
+    seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    try:
+        func(*args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    print(f"⏱️ {stage}: {seconds:.2f}s, peak memory {peak / 1024 / 1024:.1f} MB")
+    return result, seconds, peak / 1024 / 1024
+
+def count_csv_rows(file_path):
+    return len(pd.read_csv(file_path, usecols=[0])) if file_path and os.path.exists(file_path) else 0
+
+def run_benchmark(dcm_files=20, dcm_rows_per_file=500, placements=500, beeswax_rows=2000, match_rate=0.8, seed=0, label=""):
+    """Generate synthetic inputs, time the DCM merge and 3p match stages, and return one result row per stage."""
+    rng = random.Random(seed)
+    placement_ids = generate_placement_ids(placements, rng)
+    base_result = {
+        "run_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "version": get_version(),
+        "label": label,
+        "seed": seed,
+        "dcm_files": dcm_files,
+        "dcm_rows_per_file": dcm_rows_per_file,
+        "placements": placements,
+        "beeswax_rows": beeswax_rows,
+    }
+    results = []
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        dcm_folder = os.path.join(work_dir, "dcm_folder")
+        email_folder = os.path.join(dcm_folder, "dcm_email_reports")
+        beeswax_folder = os.path.join(work_dir, "Beeswax_Data")
+        os.makedirs(beeswax_folder)
+
+        print("🛠️ Generating synthetic DCM and Beeswax reports...")
+        dcm_input_rows = generate_dcm_reports(email_folder, dcm_files, dcm_rows_per_file, placement_ids, seed)
+        beeswax_file = os.path.join(beeswax_folder, f"beeswax_filtered_report_{datetime.now().strftime('%m%d%Y%H%M%S')}.csv")
+        generate_beeswax_filtered_report(beeswax_file, beeswax_rows, placement_ids, match_rate, seed)
+
+        merged_dcm_file = os.path.join(dcm_folder, "merged_dcm_report.csv")
+        _, seconds, peak_mb = measure("dcm_merge", merged_dcm_report, email_folder, merged_dcm_file)
+        results.append(dict(base_result, stage="dcm_merge", input_rows=dcm_input_rows,
+                            output_rows=count_csv_rows(merged_dcm_file), seconds=round(seconds, 3),
+                            rows_per_sec=round(dcm_input_rows / seconds, 1) if seconds else None,
+                            peak_memory_mb=round(peak_mb, 1)))
+
+        match_input_rows = count_csv_rows(merged_dcm_file)
+        output_path, seconds, peak_mb = measure("3p_match", third_party_report.process_reports, dcm_folder, beeswax_folder)
+        results.append(dict(base_result, stage="3p_match", input_rows=match_input_rows,
+                            output_rows=count_csv_rows(output_path), seconds=round(seconds, 3),
+                            rows_per_sec=round(match_input_rows / seconds, 1) if seconds else None,
+                            peak_memory_mb=round(peak_mb, 1)))
+
+    return results
+
+def save_results(results, results_file=RESULTS_FILE):
+    """Append benchmark rows to the history file so runs can be compared across versions."""
+    os.makedirs(os.path.dirname(results_file), exist_ok=True)
+    write_header = not os.path.exists(results_file)
+    with open(results_file, "a", newline="", encoding="utf-8") as file:
+        writer = csv.DictWriter(file, fieldnames=RESULT_FIELDS)
+        if write_header:
+            writer.writeheader()
+        writer.writerows(results)
+    print(f"✅ Benchmark results appended to {results_file}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the DCM merge and 3p match stages on synthetic data.")
+    parser.add_argument("--dcm-files", type=int, default=20, help="Number of DCM email reports to generate")
+    parser.add_argument("--dcm-rows", type=int, default=500, help="Data rows per DCM email report")
+    parser.add_argument("--placements", type=int, default=500, help="Distinct placement IDs across the DCM reports")
+    parser.add_argument("--beeswax-rows", type=int, default=2000, help="Rows in the Beeswax filtered report")
+    parser.add_argument("--match-rate", type=float, default=0.8, help="Share of Beeswax creatives that embed a known placement ID")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--label", default="", help="Free-text label stored with the results")
+    parser.add_argument("--results-file", default=RESULTS_FILE)
+    args = parser.parse_args()
+
+    print("🚀 Starting benchmark...")
+    results = run_benchmark(args.dcm_files, args.dcm_rows, args.placements, args.beeswax_rows,
+                            args.match_rate, args.seed, args.label)
+    save_results(results, args.results_file)
+
+    for result in results:
+        print(f"📊 {result['stage']}: {result['input_rows']} rows in {result['seconds']}s "
+              f"({result['rows_per_sec']} rows/sec, peak {result['peak_memory_mb']} MB)")
+
+if __name__ == "__main__":
+    main()
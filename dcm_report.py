@@ -2,7 +2,9 @@ import pandas as pd
 import os
 import logging
 import csv
+import io
 from datetime import datetime
+from raw_archive import RawArchive
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
@@ -44,7 +46,7 @@ def find_required_columns(header_rows, required_columns):
                 continue
     return column_indices
 
-def merged_dcm_report(folder_path, output_file):
+def merged_dcm_report(folder_path, output_file, archive=None):
     all_data = []
     required_columns = ["date", "placement id", "impressions"]
     optional_columns = ["clicks", "video completions"]
@@ -59,8 +61,14 @@ def merged_dcm_report(folder_path, output_file):
             file_path = os.path.join(folder_path, filename)
             try:
                 delimiter = ','  # Force comma delimiter
-                with open(file_path, 'r', encoding='utf-8-sig') as file:
-                    lines = file.readlines()
+                with open(file_path, 'rb') as file:
+                    raw_content = file.read()
+
+                if archive:
+                    archive.store(raw_content, filename, "dcm_email_report")
+
+                # StringIO applies the same newline handling as reading the file in text mode
+                lines = io.StringIO(raw_content.decode('utf-8-sig'), newline=None).readlines()
 
                 report_fields_row = None
                 for i, line in enumerate(lines):
@@ -134,6 +142,9 @@ def merged_dcm_report(folder_path, output_file):
         for skipped_file in skipped_files:
             print(f"- {skipped_file}")
 
-folder_path = r"C:\Catalina_auto_report\third_party_reports\dcm_folder\dcm_email_reports"
-output_file = r"C:\Catalina_auto_report\third_party_reports\dcm_folder\merged_dcm_report.csv"
-merged_dcm_report(folder_path, output_file)
\ No newline at end of file
+if __name__ == "__main__":
+    folder_path = r"C:\Catalina_auto_report\third_party_reports\dcm_folder\dcm_email_reports"
+    output_file = r"C:\Catalina_auto_report\third_party_reports\dcm_folder\merged_dcm_report.csv"
+    archive = RawArchive(run_id=f"dcm_report_{datetime.now().strftime('%Y%m%d%H%M%S')}")
+    merged_dcm_report(folder_path, output_file, archive)
+    print(archive.summary())
\ No newline at end of file
@@ -0,0 +1,211 @@
+import contextlib
+import glob
+import json
+import os
+import re
+import runpy
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+from dotenv import load_dotenv
+
+from report_schema import read_report, concat_reports, REPORT_SCHEMAS, BEESWAX_FILTERED_SCHEMA
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+load_dotenv("./input_folder/multi_account.env")
+
+ACCOUNTS_CONFIG = os.path.abspath(os.getenv("MULTI_ACCOUNT_CONFIG", "./input_folder/accounts.json"))
+OUTPUT_ROOT = os.path.abspath(os.getenv("MULTI_ACCOUNT_OUTPUT", "./accounts"))
+
+# Without these an account would silently fall back to the shared .env and pull the default account's data
+REQUIRED_ACCOUNT_KEYS = ["LOGIN_EMAIL", "PASSWORD", "BEESWAX_API_ROOT"]
+
+# Each pipeline is the existing script plus the .env it normally reads, used for settings the account doesn't override
+PIPELINES = {
+    "report": {
+        "script": os.path.join(REPO_DIR, "beeswax_report.py"),
+        "env_file": os.path.abspath("./input_folder/beeswax_input_report.env"),
+    },
+    "filter": {
+        "script": os.path.join(REPO_DIR, "beeswax_filter.py"),
+        "env_file": os.path.abspath("./input_folder/beeswax_input_filter.env"),
+    },
+}
+
+def load_accounts_config(config_path=ACCOUNTS_CONFIG):
+    """
+    Read the list of account configs.
+
+    Expected format:
+    {
+        "max_parallel": 4,
+        "combined_output": true,
+        "accounts": [
+            {
+                "name": "catalina",
+                "pipelines": ["report", "filter"],
+                "env": {"LOGIN_EMAIL": "...", "PASSWORD": "...", "BEESWAX_API_ROOT": "https://catalina.api.beeswax.com/rest/v2", ...}
+            }
+        ]
+    }
+
+    LOGIN_EMAIL, PASSWORD and BEESWAX_API_ROOT are required per account. The filter's LOGIN_URL and
+    *_URL settings may come from the shared .env; their host is replaced with BEESWAX_API_ROOT's.
+    """
+    with open(config_path, "r", encoding="utf-8") as f:
+        config = json.load(f)
+
+    accounts = config.get("accounts", [])
+    names = set()
+    for account in accounts:
+        name = account.get("name", "")
+        if not re.fullmatch(r"[A-Za-z0-9_-]+", name):
+            raise ValueError(f"Account name {name!r} must only use letters, digits, '_' or '-'")
+        if name in names or name == "combined":
+            raise ValueError(f"Account name {name!r} is duplicated or reserved")
+        names.add(name)
+        missing = [key for key in REQUIRED_ACCOUNT_KEYS if not account.get("env", {}).get(key)]
+        if missing:
+            raise ValueError(f"Account {name} is missing required env settings: {missing}")
+        unknown = set(account.get("pipelines", PIPELINES)) - set(PIPELINES)
+        if unknown:
+            raise ValueError(f"Unknown pipelines {sorted(unknown)} for account {name}")
+
+    return config
+
+def run_account_pipeline(account_name, account_env, pipeline, output_root=OUTPUT_ROOT):
+    """
+    Run one pipeline script for one account inside its own partition folder.
+
+    Runs in a worker process, so each account gets its own session, rate limiter and module state.
+    Environment and working directory are restored afterwards because pool workers are reused.
+    """
+    partition = os.path.join(output_root, account_name)
+    os.makedirs(partition, exist_ok=True)
+    log_path = os.path.join(partition, f"{pipeline}.log")
+
+    original_env = dict(os.environ)
+    original_cwd = os.getcwd()
+    if REPO_DIR not in sys.path:
+        sys.path.insert(0, REPO_DIR)
+
+    start_time = time.time()
+    status = "ok"
+    try:
+        os.environ.update({key: str(value) for key, value in account_env.items()})
+        # Account values win because load_dotenv doesn't override variables that are already set
+        load_dotenv(PIPELINES[pipeline]["env_file"])
+        os.chdir(partition)
+        with open(log_path, "a", encoding="utf-8") as log, contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+            runpy.run_path(PIPELINES[pipeline]["script"], run_name="__main__")
+    except (Exception, SystemExit) as e:  # A failing script shouldn't take the worker down
+        status = f"failed: {e!r}"
+    finally:
+        os.chdir(original_cwd)
+        os.environ.clear()
+        os.environ.update(original_env)
+
+    return {
+        "account": account_name,
+        "pipeline": pipeline,
+        "status": status,
+        "seconds": round(time.time() - start_time, 1),
+        "log": log_path,
+    }
+
+def find_report_schema(file_name):
+    if file_name.startswith("beeswax_filtered_report_"):
+        return "beeswax_filtered_report", BEESWAX_FILTERED_SCHEMA
+    for report_name, schema in REPORT_SCHEMAS.items():
+        if re.match(rf"{report_name}_(tz_|\d{{8}})", file_name):
+            return file_name, schema
+    return None, None
+
+def combine_account_outputs(account_names, since, output_root=OUTPUT_ROOT):
+    """Stack each account's outputs from this run into one file per report, with an account column."""
+    combined_folder = os.path.join(output_root, "combined")
+    os.makedirs(combined_folder, exist_ok=True)
+
+    grouped = {}
+    for account_name in account_names:
+        partition = os.path.join(output_root, account_name)
+        candidates = glob.glob(os.path.join(partition, "Beeswax_reports", "*", "Beeswax_*.csv")) + \
+            glob.glob(os.path.join(partition, "Beeswax_Data", "beeswax_filtered_report_*.csv"))
+        for file_path in candidates:
+            if os.path.getmtime(file_path) < since:
+                continue  # Left over from an earlier run
+            key, schema = find_report_schema(os.path.basename(file_path))
+            if key:
+                grouped.setdefault(key, []).append((account_name, file_path, schema))
+
+    combined_paths = []
+    for key, files in grouped.items():
+        df_list = []
+        schema = files[0][2]
+        for account_name, file_path, _ in files:
+            try:
+                df = read_report(file_path, schema)
+            except Exception as e:
+                print(f"❌ Error reading {file_path}: {e}")
+                continue
+            df.insert(0, "account", account_name)
+            df_list.append(df)
+
+        if not df_list:
+            continue
+
+        # Keep the filtered report's timestamped name so 3p_report.py can pick the combined file up as-is
+        file_name = f"beeswax_filtered_report_{datetime.now().strftime('%m%d%Y%H%M%S')}.csv" if key == "beeswax_filtered_report" else key
+        combined_path = os.path.join(combined_folder, file_name)
+        concat_reports(df_list, dict(schema, account="category")).to_csv(combined_path, index=False)
+        print(f"✅ Combined {len(df_list)} accounts into {combined_path}")
+        combined_paths.append(combined_path)
+
+    return combined_paths
+
+def main():
+    start_time = time.time()
+    print("🚀 Starting multi-account Beeswax run...")
+
+    config = load_accounts_config(ACCOUNTS_CONFIG)
+    accounts = config.get("accounts", [])
+    if not accounts:
+        print(f"❌ No accounts configured in {ACCOUNTS_CONFIG}")
+        return
+
+    jobs = [
+        (account["name"], account.get("env", {}), pipeline)
+        for account in accounts
+        for pipeline in account.get("pipelines", list(PIPELINES))
+    ]
+    max_parallel = int(config.get("max_parallel", os.cpu_count() or 1))
+    print(f"🔄 Running {len(jobs)} pipelines for {len(accounts)} accounts with up to {max_parallel} worker processes...")
+
+    results = []
+    with ProcessPoolExecutor(max_workers=max_parallel) as executor:
+        futures = [executor.submit(run_account_pipeline, name, env, pipeline, OUTPUT_ROOT) for name, env, pipeline in jobs]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            icon = "✅" if result["status"] == "ok" else "❌"
+            print(f"{icon} {result['account']} {result['pipeline']}: {result['status']} in {result['seconds']}s (log: {result['log']})")
+
+    failed = [r for r in results if r["status"] != "ok"]
+
+    if config.get("combined_output", False):
+        # Partial output from a failed pipeline would make the combined files look complete when they aren't
+        failed_accounts = {r["account"] for r in failed}
+        print("🔄 Combining account outputs...")
+        combine_account_outputs([a["name"] for a in accounts if a["name"] not in failed_accounts], start_time, OUTPUT_ROOT)
+
+    if failed:
+        print(f"⚠️ {len(failed)} of {len(results)} pipelines failed.")
+
+    minutes, seconds = divmod(time.time() - start_time, 60)
+    print(f"🎯 Multi-account run completed in {int(minutes)} minutes and {int(seconds)} seconds!")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from datetime import datetime
+
+# zstd is optional; fall back to gzip when the zstandard package isn't installed
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+DEFAULT_ARCHIVE_PATH = "./Raw_archive"
+
+class RawArchive:
+    """
+    Content-addressed, compressed store for raw report downloads and entity dumps.
+
+    Each payload is stored once under objects/<first two hash chars>/<sha256>.<ext>, however
+    many runs pull it. Every run writes runs/<run_id>.jsonl listing what it stored, so a run can
+    be replayed from the archive without calling the API.
+    """
+
+    def __init__(self, root=None, run_id=None, compression=None):
+        # Resolved here rather than at import so a RAW_ARCHIVE_PATH loaded from .env is picked up
+        self.root = os.path.abspath(root or os.getenv("RAW_ARCHIVE_PATH", DEFAULT_ARCHIVE_PATH))
+        self.run_id = run_id or datetime.now().strftime("%Y%m%d%H%M%S")
+        self.compression = compression or ("zstd" if zstandard else "gzip")
+        if self.compression == "zstd" and zstandard is None:
+            raise ImportError("zstd compression needs the zstandard package: pip install zstandard")
+
+        self._lock = threading.Lock()
+        self.stats = {"stored": 0, "deduplicated": 0, "raw_bytes": 0, "compressed_bytes": 0}
+        os.makedirs(os.path.join(self.root, "objects"), exist_ok=True)
+        os.makedirs(os.path.join(self.root, "runs"), exist_ok=True)
+
+    def _object_path(self, digest, compression):
+        ext = "zst" if compression == "zstd" else "gz"
+        return os.path.join(self.root, "objects", digest[:2], f"{digest}.{ext}")
+
+    def _find_object(self, digest):
+        for compression in ("zstd", "gzip"):
+            path = self._object_path(digest, compression)
+            if os.path.exists(path):
+                return path, compression
+        return None, None
+
+    def _compress(self, content):
+        if self.compression == "zstd":
+            return zstandard.ZstdCompressor(level=10).compress(content)
+        return gzip.compress(content, compresslevel=6)
+
+    def store(self, content, name, source, **metadata):
+        """Archive content (bytes) under its sha256 and record it in this run's manifest. Returns the digest."""
+        digest = hashlib.sha256(content).hexdigest()
+        existing_path, _ = self._find_object(digest)
+
+        if existing_path:
+            compressed_size = os.path.getsize(existing_path)
+            is_new = False
+        else:
+            object_path = self._object_path(digest, self.compression)
+            os.makedirs(os.path.dirname(object_path), exist_ok=True)
+            compressed = self._compress(content)
+            # Write to a temp file first so a concurrent reader never sees a partial object
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(object_path))
+            with os.fdopen(fd, "wb") as f:
+                f.write(compressed)
+            os.replace(tmp_path, object_path)
+            compressed_size = len(compressed)
+            is_new = True
+
+        entry = {
+            "name": name,
+            "source": source,
+            "digest": digest,
+            "size": len(content),
+            "compressed_size": compressed_size,
+            "stored_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            **metadata
+        }
+        with self._lock:
+            self.stats["stored" if is_new else "deduplicated"] += 1
+            self.stats["raw_bytes"] += len(content)
+            self.stats["compressed_bytes"] += compressed_size if is_new else 0
+            with open(os.path.join(self.root, "runs", f"{self.run_id}.jsonl"), "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+
+        return digest
+
+    def store_file(self, file_path, source, **metadata):
+        """Archive a file that is already on disk."""
+        with open(file_path, "rb") as f:
+            return self.store(f.read(), os.path.basename(file_path), source, **metadata)
+
+    def open(self, digest):
+        """Return a binary stream that decompresses the archived object as it is read."""
+        path, compression = self._find_object(digest)
+        if path is None:
+            raise FileNotFoundError(f"No archived object for {digest}")
+        if compression == "zstd":
+            if zstandard is None:
+                raise ImportError(f"{path} is zstd-compressed; install the zstandard package to read it")
+            return zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+        return gzip.open(path, "rb")
+
+    def run_entries(self, run_id=None):
+        """Return the manifest entries recorded by a run (this run by default)."""
+        manifest_path = os.path.join(self.root, "runs", f"{run_id or self.run_id}.jsonl")
+        if not os.path.exists(manifest_path):
+            return []
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def list_runs(self):
+        runs_folder = os.path.join(self.root, "runs")
+        return sorted(f[:-len(".jsonl")] for f in os.listdir(runs_folder) if f.endswith(".jsonl"))
+
+    def summary(self):
+        saved = self.stats["raw_bytes"] - self.stats["compressed_bytes"]
+        return (f"🗄️ Archived run {self.run_id}: {self.stats['stored']} new, {self.stats['deduplicated']} already stored, "
+                f"{self.stats['raw_bytes'] / 1024 / 1024:.1f} MB raw -> {self.stats['compressed_bytes'] / 1024 / 1024:.1f} MB written "
+                f"({saved / 1024 / 1024:.1f} MB saved)")
@@ -0,0 +1,96 @@
+import pandas as pd
+
+# Column types for every report frame we load. IDs and counts are nullable integers, repeated
+# names are categoricals, dates are parsed, and free text stays as plain strings.
+BEESWAX_SPEND_SCHEMA = {
+    "campaign_id": "Int64",
+    "line_item_id": "Int64",
+    "bid_day": "datetime64[ns]",
+    "campaign_name": "category",
+    "line_item_name": "category",
+    "spend": "float64",
+    "impression": "Int64",
+    "clicks": "Int64",
+}
+
+BEESWAX_REACH_LI_SCHEMA = {
+    "campaign_id": "Int64",
+    "line_item_id": "Int64",
+    "campaign_name": "category",
+    "line_item_name": "category",
+    "reach_standard_fallback": "Int64",
+}
+
+BEESWAX_REACH_C_SCHEMA = {
+    "campaign_name": "category",
+    "reach_standard_fallback": "Int64",
+}
+
+REPORT_SCHEMAS = {
+    "Beeswax_Spend": BEESWAX_SPEND_SCHEMA,
+    "Beeswax_Reach_LI": BEESWAX_REACH_LI_SCHEMA,
+    "Beeswax_Reach_C": BEESWAX_REACH_C_SCHEMA,
+}
+
+BEESWAX_FILTERED_SCHEMA = {
+    "campaign_campaign_id": "Int64",
+    "campaign_campaign_name": "category",
+    "line_item_line_item_id": "Int64",
+    "line_item_line_item_name": "category",
+    "creative_creative_id": "Int64",
+    "creative_creative_name": "category",
+    "creative_pixels": "str",
+    "creative_scripts": "str",
+    "creative_creative_content_munge": "str",
+}
+
+# Placement IDs are looked up as whole digit runs in an index built from the URL-decoded creative blobs,
+# so they stay text (as categories)
+DCM_MERGED_SCHEMA = {
+    "Date": "datetime64[ns]",
+    "Placement ID": "category",
+    "Impressions": "Int64",
+    "Clicks": "Int64",
+    "Video Completions": "Int64",
+}
+
+# Large tracker/markup columns that are only needed to build the placement match index
+BLOB_COLUMNS = ["creative_pixels", "creative_scripts", "creative_creative_content_munge"]
+
+NUMERIC_DTYPES = ("Int64", "float64")
+
+def apply_schema(df, schema):
+    """Convert the columns of df that appear in schema to their compact types, in place."""
+    for col, dtype in schema.items():
+        if col not in df.columns:
+            continue
+        if dtype in NUMERIC_DTYPES or dtype.startswith("datetime64"):
+            present = df[col].notna().sum()
+            if dtype in NUMERIC_DTYPES:
+                df[col] = pd.to_numeric(df[col], errors="coerce").astype(dtype)
+            else:
+                df[col] = pd.to_datetime(df[col], errors="coerce")
+            lost = present - df[col].notna().sum()
+            if lost:
+                print(f"⚠️ {lost} value(s) in '{col}' couldn't be parsed as {dtype} and were set to empty")
+        elif dtype == "category" and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype("category")
+    return df
+
+def read_report(filepath_or_buffer, schema, **kwargs):
+    """Read a report CSV straight into the compact types defined by schema."""
+    # Text columns are read as-is so numeric-looking names and IDs inside blobs keep their exact form
+    read_dtypes = {col: dtype for col, dtype in schema.items() if dtype in ("category", "str")}
+    df = pd.read_csv(filepath_or_buffer, dtype=read_dtypes, **kwargs)
+    return apply_schema(df, schema)
+
+def concat_reports(df_list, schema):
+    """Concatenate report chunks and restore categoricals that pandas widens when categories differ."""
+    return apply_schema(pd.concat(df_list, ignore_index=True), schema)
+
+def drop_blob_columns(df):
+    """Drop the creative blob columns once they are no longer needed."""
+    return df.drop(columns=[col for col in BLOB_COLUMNS if col in df.columns])
+
+def memory_usage_mb(df):
+    return df.memory_usage(deep=True).sum() / 1024 / 1024
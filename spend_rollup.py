@@ -0,0 +1,141 @@
+import os
+
+import pandas as pd
+
+from report_schema import read_report, apply_schema, BEESWAX_SPEND_SCHEMA
+
+DEFAULT_ROLLUP_PATH = "./Beeswax_reports/rollups"
+DAILY_ROLLUP_FILE = "spend_daily_rollup.csv"
+MONTHLY_ROLLUP_FILE = "spend_monthly_rollup.csv"
+
+METRIC_COLUMNS = ["spend", "impression", "clicks"]
+
+SPEND_DAILY_ROLLUP_SCHEMA = {
+    "campaign_id": "Int64",
+    "campaign_name": "category",
+    "bid_day": "datetime64[ns]",
+    "timezone": "category",
+    "spend": "float64",
+    "impression": "Int64",
+    "clicks": "Int64",
+}
+
+SPEND_MONTHLY_ROLLUP_SCHEMA = {
+    "campaign_id": "Int64",
+    "campaign_name": "category",
+    "month": "category",
+    "timezone": "category",
+    "spend": "float64",
+    "impression": "Int64",
+    "clicks": "Int64",
+}
+
+def aggregate_daily(spend_df, timezone):
+    """Roll line item x bid_day rows up to campaign x bid_day for one timezone."""
+    unusable = spend_df["campaign_id"].isna() | spend_df["bid_day"].isna()
+    if unusable.any():
+        print(f"⚠️ Skipping {int(unusable.sum())} Spend row(s) for {timezone} with no campaign_id or bid_day")
+    daily = (
+        spend_df[~unusable]
+        .groupby(["campaign_id", "bid_day"], as_index=False, observed=True)
+        .agg(campaign_name=("campaign_name", "last"), spend=("spend", "sum"),
+             impression=("impression", "sum"), clicks=("clicks", "sum"))
+    )
+    daily["timezone"] = timezone
+    return apply_schema(daily[list(SPEND_DAILY_ROLLUP_SCHEMA)], SPEND_DAILY_ROLLUP_SCHEMA)
+
+def aggregate_monthly(daily_df):
+    """Roll campaign x day rows up to campaign x month, per timezone."""
+    monthly = daily_df.assign(month=daily_df["bid_day"].dt.strftime("%Y-%m"))
+    monthly = (
+        monthly.groupby(["campaign_id", "month", "timezone"], as_index=False, observed=True)
+        .agg(campaign_name=("campaign_name", "last"), spend=("spend", "sum"),
+             impression=("impression", "sum"), clicks=("clicks", "sum"))
+    )
+    return apply_schema(monthly[list(SPEND_MONTHLY_ROLLUP_SCHEMA)], SPEND_MONTHLY_ROLLUP_SCHEMA)
+
+def find_changed_days(old_daily, new_daily):
+    """Return the bid_days whose campaign rows or totals differ between the stored and pulled cubes."""
+    merged = old_daily.merge(new_daily, on=["campaign_id", "bid_day"], how="outer", suffixes=("_old", "_new"), indicator=True)
+    changed = merged["_merge"] != "both"
+    changed |= (merged["spend_old"].astype("float64") - merged["spend_new"].astype("float64")).abs().fillna(0) > 1e-6
+    for col in ["impression", "clicks"]:
+        changed |= (merged[f"{col}_old"] != merged[f"{col}_new"]).fillna(True)
+    changed |= (merged["campaign_name_old"].astype(str) != merged["campaign_name_new"].astype(str)) & (merged["_merge"] == "both")
+    return set(merged.loc[changed, "bid_day"])
+
+def write_rollup(df, file_path):
+    # Write to a temp file first so dashboards never read a half-written cube
+    tmp_path = f"{file_path}.tmp"
+    df.to_csv(tmp_path, index=False, date_format="%Y-%m-%d")
+    os.replace(tmp_path, file_path)
+
+def update_spend_rollups(spend_report_path, timezone, windows=None, rollup_folder=None):
+    """
+    Fold a merged Beeswax_Spend report into the campaign x day x timezone and campaign x month cubes.
+
+    windows lists the (start_date, end_date) ranges of the chunks that actually downloaded and
+    parsed; stored days inside them that changed or no longer have any rows are replaced. Days
+    outside them keep their stored values, so neither a failed chunk nor moving START_DATE_SPEND
+    forward drops history. Without windows, the first and last bid_day in the report are used.
+    """
+    if windows is not None and not windows:
+        print(f"⚠️ No Spend chunks arrived for {timezone}; leaving the rollups untouched.")
+        return None
+
+    rollup_folder = os.path.abspath(rollup_folder or os.getenv("SPEND_ROLLUP_PATH", DEFAULT_ROLLUP_PATH))
+    os.makedirs(rollup_folder, exist_ok=True)
+    daily_path = os.path.join(rollup_folder, DAILY_ROLLUP_FILE)
+    monthly_path = os.path.join(rollup_folder, MONTHLY_ROLLUP_FILE)
+
+    new_daily = aggregate_daily(read_report(spend_report_path, BEESWAX_SPEND_SCHEMA), timezone)
+    if new_daily.empty and windows is None:
+        print(f"⚠️ No Spend rows to roll up for {timezone}.")
+        return None
+    if windows is None:
+        windows = [(new_daily["bid_day"].min(), new_daily["bid_day"].max())]
+    windows = [(pd.Timestamp(start), pd.Timestamp(end)) for start, end in windows]
+
+    if os.path.exists(daily_path):
+        daily_cube = read_report(daily_path, SPEND_DAILY_ROLLUP_SCHEMA)
+    else:
+        daily_cube = new_daily.iloc[0:0]
+
+    def in_windows(days):
+        mask = pd.Series(False, index=days.index)
+        for start, end in windows:
+            mask |= days.between(start, end)
+        return mask
+
+    # Compare only this timezone's stored rows inside the ranges we just received
+    first_day = min(start for start, _ in windows)
+    last_day = max(end for _, end in windows)
+    new_daily = new_daily[in_windows(new_daily["bid_day"])]
+    in_window = (daily_cube["timezone"] == timezone) & in_windows(daily_cube["bid_day"])
+    changed_days = find_changed_days(daily_cube[in_window], new_daily)
+
+    if not changed_days:
+        print(f"✅ Spend rollups for {timezone} already up to date ({first_day:%Y-%m-%d} to {last_day:%Y-%m-%d}).")
+        return {"timezone": timezone, "changed_days": 0, "changed_months": 0}
+
+    replaced = (daily_cube["timezone"] == timezone) & daily_cube["bid_day"].isin(changed_days)
+    daily_cube = pd.concat([daily_cube[~replaced], new_daily[new_daily["bid_day"].isin(changed_days)]], ignore_index=True)
+    daily_cube = apply_schema(daily_cube, SPEND_DAILY_ROLLUP_SCHEMA).sort_values(["timezone", "bid_day", "campaign_id"], ignore_index=True)
+    write_rollup(daily_cube, daily_path)
+
+    # Rebuild only the months that contain a changed day
+    changed_months = {day.strftime("%Y-%m") for day in changed_days}
+    month_rows = (daily_cube["timezone"] == timezone) & daily_cube["bid_day"].dt.strftime("%Y-%m").isin(changed_months)
+    new_monthly = aggregate_monthly(daily_cube[month_rows])
+
+    if os.path.exists(monthly_path):
+        monthly_cube = read_report(monthly_path, SPEND_MONTHLY_ROLLUP_SCHEMA)
+        stale = (monthly_cube["timezone"] == timezone) & monthly_cube["month"].astype(str).isin(changed_months)
+        monthly_cube = pd.concat([monthly_cube[~stale], new_monthly], ignore_index=True)
+    else:
+        monthly_cube = new_monthly
+    monthly_cube = apply_schema(monthly_cube, SPEND_MONTHLY_ROLLUP_SCHEMA).sort_values(["timezone", "month", "campaign_id"], ignore_index=True)
+    write_rollup(monthly_cube, monthly_path)
+
+    print(f"✅ Spend rollups for {timezone}: updated {len(changed_days)} days across {len(changed_months)} months in {rollup_folder}")
+    return {"timezone": timezone, "changed_days": len(changed_days), "changed_months": len(changed_months)}